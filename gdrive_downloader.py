@@ -1,32 +1,190 @@
 import os
 import re
 import json
+import bisect
+import ctypes
+import functools
+import mimetypes
+import queue
+import shutil
+import socket
+import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import repeat
 from pathlib import Path
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qs, unquote, urlparse
 import threading
-from bs4 import BeautifulSoup
+
+
+@functools.lru_cache(maxsize=8)
+def _read_config(path):
+    """Parse a config file once per process, keyed by its absolute path"""
+    return json.loads(Path(path).read_bytes())
+
+
+def _stdout_supports_ansi():
+    """Whether stdout is a terminal that interprets ANSI cursor escapes"""
+    isatty = getattr(sys.stdout, 'isatty', None)
+    if not (isatty and isatty()):
+        return False
+    if os.name != 'nt':
+        return True
+    # Windows consoles need virtual terminal processing switched on; legacy conhost refuses it
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+    mode = ctypes.c_uint32()
+    if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        return False
+    return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+
+
+class _TunedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that can give its pooled sockets a fixed kernel receive buffer
+
+    Off by default: setting SO_RCVBUF disables TCP receive autotuning on Linux,
+    and the value is clamped to net.core.rmem_max, which is far below what
+    autotuning reaches on its own.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['rcvbuf']
+
+    def __init__(self, *args, rcvbuf=0, **kwargs):
+        # Set before super().__init__, which already builds the pool manager
+        self.rcvbuf = rcvbuf
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        socket_options = list(HTTPConnection.default_socket_options)
+        if self.rcvbuf:
+            socket_options.append((socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf))
+        kwargs['socket_options'] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class _ProgressWriter:
+    """File wrapper that adds the number of written bytes to counters[index]
+
+    Each writer owns its slot, so counting needs no lock; the reporter thread
+    only ever reads the counters.
+    """
+
+    def __init__(self, f, counters, index=0):
+        self.f = f
+        self.counters = counters
+        self.index = index
+
+    def write(self, data):
+        self.f.write(data)
+        self.counters[self.index] += len(data)
+
+
+class _RangeFile:
+    """Write-only file object that pwrite()s into a shared fd at an advancing offset"""
+
+    def __init__(self, fd, offset):
+        self.fd = fd
+        self.offset = offset
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self.fd, view, self.offset)
+            view = view[written:]
+            self.offset += written
+
 
 class GDriveDownloader:
+    # Every Drive ID form in a single alternation, so each URL or page is scanned
+    # in one regex pass; group 2 (`/folders/`) marks the ID as a folder
+    _FILE_ID_RE = re.compile(r'/file/d/([a-zA-Z0-9_-]+)|/folders/([a-zA-Z0-9_-]+)|id=([a-zA-Z0-9_-]+)')
+    _TITLE_RE = re.compile(r'<title>([^<]+)</title>')
+    _CONTENT_DISPOSITION_RE = re.compile(r'filename\*?=["\']?(?:UTF-8\'\')?([^"\';]+)')
+    # Characters not allowed in file names, replaced with '_' via str.translate
+    _INVALID_FS_CHARS = str.maketrans(dict.fromkeys('<>:"/\\|?*', '_'))
+    # Sent with every file body request: Drive files are usually compressed
+    # formats already, and an identity body can be read without a decoder
+    _IDENTITY_ENCODING = {'Accept-Encoding': 'identity'}
+    # Extension by bare MIME type (Content-Type without parameters)
+    _MIME_TO_EXT = {
+        'image/jpeg': '.jpg',
+        'image/png': '.png',
+        'image/gif': '.gif',
+        'image/webp': '.webp',
+        'application/pdf': '.pdf',
+        'application/zip': '.zip',
+        'application/x-rar-compressed': '.rar',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+        'application/vnd.openxmlformats-officedocument.presentationml.presentation': '.pptx',
+        'text/plain': '.txt',
+        'text/html': '.html',
+        'video/mp4': '.mp4',
+        'video/x-matroska': '.mkv',
+        'audio/mpeg': '.mp3',
+        # Generic binary: keep the name as is rather than let mimetypes add '.bin'
+        'application/octet-stream': '',
+    }
+
     def __init__(self, config_file="config.json"):
         self.config = self.load_config(config_file)
         self.download_dir = self.config.get("download_directory", "./downloads")
-        self.max_workers = self.config.get("max_threads", 5)
+        max_threads = self.config.get("max_threads", self.default_max_threads())
+        # GDRIVE_MAX_THREADS overrides the config, e.g. for one-off runs
+        env_threads = os.environ.get("GDRIVE_MAX_THREADS")
+        if env_threads:
+            try:
+                max_threads = int(env_threads)
+            except ValueError:
+                print(f"⚠ Ignoring GDRIVE_MAX_THREADS={env_threads!r} (not an integer), using {max_threads} threads")
+        self.max_workers = max(1, int(max_threads))
         self.session = requests.Session()
-        self.lock = threading.Lock()
+        # Size the pool so every worker (and each of its range parts) keeps its own
+        # keep-alive connection instead of evicting others and re-handshaking
+        connections_per_host = self.max_workers * max(int(self.config.get("range_parts", 4)), 1)
+        adapter = _TunedHTTPAdapter(
+            pool_connections=max(32, self.max_workers * 2),
+            pool_maxsize=max(32, connections_per_host),
+            # raise_on_status=False: once retries run out, callers get the last response as before
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                              raise_on_status=False),
+            rcvbuf=int(self.config.get("socket_rcvbuf", 0))
+        )
+        self.session.mount("https://", adapter)
+        # Worker output goes through this queue to a single logger thread
+        self._log_queue = queue.SimpleQueue()
+        self._logger = None
+        # Destination path -> (filename, total_size, byte counters) of running downloads
+        self._progress = {}
+        # file_id -> is folder / folder name, so each ID is probed over HTTP
+        # at most once. Not locked: a race only costs a duplicate request
+        self._folder_cache = {}
+        self._folder_name_cache = {}
+        # Download directories already created by this instance
+        self._created_dirs = set()
         
+    @staticmethod
+    def default_max_threads():
+        """Default worker count for this I/O-bound workload (same formula as ThreadPoolExecutor)"""
+        return min(32, (os.cpu_count() or 1) + 4)
+
     def load_config(self, config_file):
         """Load configuration from JSON file"""
         if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # Copy, since the cached dict is shared by every downloader instance
+            return dict(_read_config(os.path.abspath(config_file)))
         else:
             # Create default config
             default_config = {
                 "download_directory": "./downloads",
-                "max_threads": 5,
-                "chunk_size": 32768
+                "max_threads": self.default_max_threads(),
+                "chunk_size": 1048576,
+                "range_parts": 4,
+                "range_min_size": 67108864,
+                "socket_rcvbuf": 0
             }
             with open(config_file, 'w', encoding='utf-8') as f:
                 json.dump(default_config, f, indent=4)
@@ -35,152 +193,221 @@ class GDriveDownloader:
     
     def extract_file_id(self, url):
         """Extract file ID from Google Drive URL"""
-        patterns = [
-            r'/file/d/([a-zA-Z0-9_-]+)',
-            r'id=([a-zA-Z0-9_-]+)',
-            r'/folders/([a-zA-Z0-9_-]+)',
-            r'drive\.google\.com/open\?id=([a-zA-Z0-9_-]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        match = self._FILE_ID_RE.search(url)
+        return match.group(match.lastindex) if match else None
+    
+    def extract_file_ids(self, urls):
+        """Extract file IDs from many URLs with a single regex pass
+
+        Returns a list aligned with urls, holding None where no ID was found.
+        """
+        # Match over the newline-joined URLs and map each match back to its
+        # line through the offsets where the lines start
+        line_starts = []
+        offset = 0
+        for url in urls:
+            line_starts.append(offset)
+            offset += len(url) + 1
+
+        file_ids = [None] * len(urls)
+        for match in self._FILE_ID_RE.finditer("\n".join(urls)):
+            line = bisect.bisect_right(line_starts, match.start()) - 1
+            if file_ids[line] is None:
+                file_ids[line] = match.group(match.lastindex)
+        return file_ids
     
     def is_folder(self, file_id):
-        """Check if the ID is a folder"""
-        url = f"https://drive.google.com/drive/folders/{file_id}"
-        response = self.session.get(url, allow_redirects=True)
-        return 'folders' in response.url
+        """Check if the ID is a folder (cached per ID)"""
+        if file_id not in self._folder_cache:
+            # Only the final URL after redirects matters, so skip the page body
+            url = f"https://drive.google.com/drive/folders/{file_id}"
+            response = self.session.head(url, allow_redirects=True)
+            self._folder_cache[file_id] = 'folders' in response.url
+        return self._folder_cache[file_id]
     
     def get_folder_name(self, file_id):
-        """Get folder name from Google Drive"""
+        """Get folder name from Google Drive (cached per ID)"""
+        folder_name = self._folder_name_cache.get(file_id)
+        if folder_name is None:
+            folder_name = self._fetch_folder_name(file_id)
+            self._folder_name_cache[file_id] = folder_name
+        return folder_name
+    
+    def _fetch_folder_name(self, file_id):
+        """Fetch folder name from the folder page title"""
         try:
             url = f"https://drive.google.com/drive/folders/{file_id}"
-            response = self.session.get(url)
+            # Stream the page and stop at </title> instead of downloading and decoding all of it
+            head = b''
+            with self.session.get(url, stream=True) as response:
+                if response.status_code == 200:
+                    for chunk in response.iter_content(16384):
+                        head += chunk
+                        end = head.find(b'</title>', max(0, len(head) - len(chunk) - 7))
+                        if end != -1:
+                            head = head[:end + 8]
+                            break
             
-            if response.status_code == 200:
+            if head:
                 # Try to extract folder name from title
-                title_match = re.search(r'<title>([^<]+)</title>', response.text)
+                title_match = self._TITLE_RE.search(head.decode('utf-8', 'ignore'))
                 if title_match:
                     folder_name = title_match.group(1).replace(' - Google Drive', '').strip()
                     # Clean folder name
-                    folder_name = re.sub(r'[<>:"/\\|?*]', '_', folder_name)
+                    folder_name = folder_name.translate(self._INVALID_FS_CHARS)
                     return folder_name if folder_name else f"folder_{file_id[:8]}"
             
             return f"folder_{file_id[:8]}"
         except:
             return f"folder_{file_id[:8]}"
     
-    def get_file_metadata(self, file_id):
-        """Get file metadata from Google Drive"""
-        try:
-            # First, try to get file info page
-            info_url = f"https://drive.google.com/file/d/{file_id}/view"
-            response = self.session.get(info_url)
-            
-            filename = None
-            
-            # Try to extract filename from page title
-            if response.status_code == 200:
-                title_match = re.search(r'<title>([^<]+)</title>', response.text)
-                if title_match:
-                    filename = title_match.group(1).replace(' - Google Drive', '').strip()
-                    # Clean filename
-                    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-            
-            # Get download URL
-            download_url = f"https://drive.google.com/uc?id={file_id}&export=download"
-            
-            # Try direct download to get proper filename and extension
-            response = self.session.get(download_url, stream=True, allow_redirects=True)
-            
-            # Get filename from Content-Disposition header
-            if 'Content-Disposition' in response.headers:
-                content_disp = response.headers['Content-Disposition']
-                filename_match = re.search(r'filename\*?=["\']?(?:UTF-8\'\')?([^"\';]+)', content_disp)
-                if filename_match:
-                    header_filename = filename_match.group(1)
-                    # Decode URL-encoded filename
-                    from urllib.parse import unquote
-                    header_filename = unquote(header_filename)
-                    if header_filename and '.' in header_filename:
-                        filename = header_filename
-            
-            # Get content type to determine extension
-            content_type = response.headers.get('Content-Type', '')
-            
-            # If still no filename or no extension, try to add one
-            if not filename or '.' not in filename:
-                extension = self.get_extension_from_content_type(content_type)
-                if filename and extension:
-                    filename = f"{filename}{extension}"
-                elif not filename:
-                    filename = f"file_{file_id}{extension}"
-            
-            return {
-                'filename': filename,
-                'url': download_url,
-                'file_id': file_id,
-                'response': response
-            }
-        except Exception as e:
-            print(f"Error getting metadata: {e}")
-            return {
-                'filename': f"file_{file_id}",
-                'url': f"https://drive.google.com/uc?id={file_id}&export=download",
-                'file_id': file_id,
-                'response': None
-            }
+    def _filename_from_response(self, file_id, response):
+        """Pick a file name from the Content-Disposition and Content-Type headers of a download response"""
+        filename = None
+        
+        # Get filename from Content-Disposition header
+        content_disp = response.headers.get('Content-Disposition')
+        if content_disp:
+            filename_match = self._CONTENT_DISPOSITION_RE.search(content_disp)
+            if filename_match:
+                # Decode URL-encoded filename
+                filename = unquote(filename_match.group(1)).translate(self._INVALID_FS_CHARS)
+        
+        # If no filename or no extension, derive one from the content type
+        if not filename or '.' not in filename:
+            extension = self.get_extension_from_content_type(response.headers.get('Content-Type', ''))
+            filename = f"{filename or f'file_{file_id}'}{extension}"
+        
+        return filename
+    
+    def _api_list_children(self, folder_id):
+        """List the direct children of a folder through the Drive API v3.
+
+        Needs an `api_key` in the config and a folder shared by link (shared drives
+        included). Pages through `nextPageToken`, 1000 items per request.
+        Returns a list of tuples: (file_id, name, is_folder).
+        """
+        children = []
+        params = {
+            'q': f"'{folder_id}' in parents and trashed = false",
+            'fields': 'nextPageToken, files(id, name, mimeType)',
+            'pageSize': 1000,
+            'supportsAllDrives': 'true',
+            'includeItemsFromAllDrives': 'true',
+        }
+        # The key goes in a header, not the query string, so it never shows up
+        # in URLs quoted by request errors
+        headers = {'X-goog-api-key': self.config["api_key"]}
+
+        while True:
+            response = self.session.get("https://www.googleapis.com/drive/v3/files",
+                                        params=params, headers=headers)
+            if response.status_code != 200:
+                # Not raise_for_status(): keep the message to the status code
+                raise IOError(f"Drive API returned HTTP {response.status_code}")
+            data = response.json()
+
+            for item in data.get('files', []):
+                name = item['name'].translate(self._INVALID_FS_CHARS)
+                children.append((item['id'], name, item['mimeType'] == 'application/vnd.google-apps.folder'))
 
-    def list_folder_items(self, folder_id, parent_folder_name=None, depth=0, max_depth=5):
-        """Recursively list files inside a Google Drive folder by scraping the folder page.
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return children
+            params['pageToken'] = page_token
 
+    def _scrape_folder_children(self, folder_id):
+        """List the direct children of a folder by scraping the folder page.
+
+        Names are not available from the page, so they are returned as None.
+        Returns a list of tuples: (file_id, None, is_folder).
+        """
+        url = f"https://drive.google.com/drive/folders/{folder_id}"
+
+        # Find potential IDs on the folder page, remembering which ones
+        # appeared in a '/folders/{id}' link
+        found_ids = {}
+
+        def collect(m):
+            fid = m.group(m.lastindex)
+            if fid != folder_id:
+                found_ids[fid] = found_ids.get(fid, False) or m.lastindex == 2
+
+        # Scan the page chunk by chunk instead of materializing response.text.
+        # IDs are ASCII, so latin-1 decoding is safe; a match that reaches into
+        # the last 64 characters may be cut off and is rescanned with the next chunk
+        tail = ''
+        with self.session.get(url, stream=True) as response:
+            for chunk in response.iter_content(chunk_size=65536):
+                buf = tail + chunk.decode('latin-1')
+                cut = max(len(buf) - 64, 0)
+                for m in self._FILE_ID_RE.finditer(buf):
+                    if m.end() > cut:
+                        cut = min(cut, m.start())
+                        break
+                    collect(m)
+                tail = buf[cut:]
+        for m in self._FILE_ID_RE.finditer(tail):
+            collect(m)
+
+        children = []
+        for fid, seen_as_folder in found_ids.items():
+            # Be conservative: treat as folder if the URL pattern for folders was found
+            # Otherwise, check via is_folder
+            is_f = False
+            if seen_as_folder:
+                is_f = True
+            else:
+                try:
+                    is_f = self.is_folder(fid)
+                except Exception:
+                    is_f = False
+            children.append((fid, None, is_f))
+
+        return children
+
+    def list_folder_items(self, folder_id, parent_folder_name=None, depth=0, max_depth=5, messages=None):
+        """Recursively list files inside a Google Drive folder.
+
+        Uses the Drive API when an `api_key` is configured, otherwise (or if the
+        API call fails) scrapes the folder page. Warnings are appended to
+        `messages` when a list is given, and printed otherwise.
         Returns a list of tuples: (file_id, folder_name) for files to download.
         """
         if depth > max_depth:
             return []
 
         try:
-            url = f"https://drive.google.com/drive/folders/{folder_id}"
-            response = self.session.get(url)
-            text = response.text if response is not None else ""
-
-            # Find potential IDs on the folder page
-            found_ids = set()
-            patterns = [r'/file/d/([a-zA-Z0-9_-]+)', r'/folders/([a-zA-Z0-9_-]+)', r'id=([a-zA-Z0-9_-]+)']
-            for pattern in patterns:
-                for m in re.findall(pattern, text):
-                    if m and m != folder_id:
-                        found_ids.add(m)
+            children = None
+            if self.config.get("api_key"):
+                try:
+                    children = self._api_list_children(folder_id)
+                except Exception as e:
+                    warning = f"  ⚠ Drive API listing failed for {folder_id}, scraping page instead: {e}"
+                    if messages is None:
+                        print(warning)
+                    else:
+                        messages.append(warning)
+            if children is None:
+                children = self._scrape_folder_children(folder_id)
 
             results = []
             # Use provided parent folder name or derive one
             folder_name = parent_folder_name or self.get_folder_name(folder_id)
 
-            for fid in found_ids:
-                # Be conservative: treat as folder if the URL pattern for folders was found
-                # Otherwise, check via is_folder
-                is_f = False
-                # Quick heuristic: if the raw text contains '/folders/{fid}' assume folder
-                if f"/folders/{fid}" in text:
-                    is_f = True
-                else:
-                    try:
-                        is_f = self.is_folder(fid)
-                    except Exception:
-                        is_f = False
-
+            for fid, name, is_f in children:
+                # Remember the answer (including negatives) for later is_folder calls
+                self._folder_cache[fid] = is_f
                 if is_f:
                     # Recurse into subfolder, nest the folder name
                     try:
-                        child_name = self.get_folder_name(fid)
+                        child_name = name or self.get_folder_name(fid)
                         combined_name = os.path.join(folder_name, child_name)
                     except Exception:
                         combined_name = folder_name
 
-                    results.extend(self.list_folder_items(fid, parent_folder_name=combined_name, depth=depth+1, max_depth=max_depth))
+                    results.extend(self.list_folder_items(fid, parent_folder_name=combined_name, depth=depth+1,
+                                                          max_depth=max_depth, messages=messages))
                 else:
                     results.append((fid, folder_name))
 
@@ -190,40 +417,143 @@ class GDriveDownloader:
     
     def get_extension_from_content_type(self, content_type):
         """Get file extension from content type"""
-        extensions = {
-            'image/jpeg': '.jpg',
-            'image/png': '.png',
-            'image/gif': '.gif',
-            'image/webp': '.webp',
-            'application/pdf': '.pdf',
-            'application/zip': '.zip',
-            'application/x-rar-compressed': '.rar',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
-            'application/vnd.openxmlformats-officedocument.presentationml.presentation': '.pptx',
-            'text/plain': '.txt',
-            'text/html': '.html',
-            'video/mp4': '.mp4',
-            'audio/mpeg': '.mp3',
-        }
-        
-        for mime_type, ext in extensions.items():
-            if mime_type in content_type:
-                return ext
-        
-        return ''
+        mime_type = content_type.split(';', 1)[0].strip().lower()
+        extension = self._MIME_TO_EXT.get(mime_type)
+        if extension is None:
+            extension = mimetypes.guess_extension(mime_type) or ''
+        return extension
     
-    def download_file(self, file_id, folder_name=None):
-        """Download a single file from Google Drive"""
+    def _preallocate(self, fd, size):
+        """Reserve size bytes for fd so the filesystem can lay the file out contiguously
+
+        posix_fallocate is only used on Linux, where common filesystems implement
+        it natively. Elsewhere (and on Linux filesystems without fallocate) libc
+        emulates it by writing one byte per block over the whole size, which
+        costs millions of writes for a multi-GB file before any data arrives;
+        ftruncate just sets the size and leaves the file sparse.
+        """
+        if sys.platform.startswith('linux'):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError:
+                # e.g. EINVAL from filesystems that reject preallocation outright
+                pass
+        os.ftruncate(fd, size)
+
+    def _copy_response(self, response, f, buffer_size):
+        """Copy a streamed response body into f through one reused buffer.
+
+        os.sendfile/splice cannot be used: Drive is HTTPS and TLS is decrypted
+        in-process. Identity-encoded bodies are read with readinto() straight
+        from the underlying http.client response, which skips the bytes object
+        urllib3 allocates for every chunk; encoded bodies go through urllib3's
+        decoder into the same buffer.
+
+        Returns the number of bytes written. Raises IOError if an identity body
+        ends before its Content-Length: http.client reports that early EOF as a
+        plain end of stream, without urllib3's length check.
+        """
+        fp = getattr(response.raw, '_fp', None)
+        direct = 'Content-Encoding' not in response.headers and hasattr(fp, 'readinto')
+        if direct:
+            source = fp
+        else:
+            response.raw.decode_content = True
+            source = response.raw
+
+        buf = memoryview(bytearray(buffer_size))
+        # Bound methods as locals: no attribute lookups inside the copy loop
+        readinto = source.readinto
+        write = f.write
+        copied = 0
+        while True:
+            n = readinto(buf)
+            if not n:
+                break
+            write(buf[:n])
+            copied += n
+
+        if direct:
+            expected = int(response.headers.get('Content-Length', 0))
+            if copied < expected:
+                raise IOError(f"connection closed after {copied} of {expected} bytes")
+            # The body was read past urllib3, so return the connection to the pool explicitly
+            response.raw.release_conn()
+        return copied
+
+    def _download_range(self, url, fd, start, end, counters, index, buffer_size):
+        """Download bytes start..end (inclusive) of url into fd at the same offsets
+
+        Returns False without writing anything if the server ignored the Range header.
+        Raises IOError if the part comes back shorter than the requested range.
+        """
+        headers = {**self._IDENTITY_ENCODING, 'Range': f"bytes={start}-{end}"}
+        with self.session.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 200:
+                return False
+            if response.status_code != 206:
+                raise IOError(f"range request returned HTTP {response.status_code}")
+            copied = self._copy_response(response, _ProgressWriter(_RangeFile(fd, start), counters, index), buffer_size)
+        if copied != end - start + 1:
+            raise IOError(f"range {start}-{end} returned {copied} of {end - start + 1} bytes")
+        return True
+
+    def _ranged_download(self, url, filepath, total_size, parts, counters, buffer_size):
+        """Download a file as `parts` parallel byte ranges written in place with pwrite
+
+        Returns False if the server answered the range requests with the whole file.
+        """
+        part_size = -(-total_size // parts)
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            self._preallocate(fd, total_size)
+            with ThreadPoolExecutor(max_workers=parts) as executor:
+                futures = [
+                    executor.submit(self._download_range, url, fd, start,
+                                    min(start + part_size, total_size) - 1,
+                                    counters, i, buffer_size)
+                    for i, start in enumerate(range(0, total_size, part_size))
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            os.close(fd)
+        return all(results)
+
+    def download_file(self, file_id, folder_name=None, check_folder=True):
+        """Download a single file from Google Drive
+
+        Pass check_folder=False when the caller already knows file_id is a file.
+        """
         try:
             # Check if it's a folder
-            if self.is_folder(file_id):
-                with self.lock:
-                    print(f"⚠ Skipping folder: {file_id} (folder download not implemented yet)")
+            if check_folder and self.is_folder(file_id):
+                self._log(f"⚠ Skipping folder: {file_id} (folder download not implemented yet)")
                 return False
             
-            metadata = self.get_file_metadata(file_id)
-            filename = metadata['filename']
+            download_url = f"https://drive.google.com/uc?id={file_id}&export=download"
+            response = self.session.get(download_url, headers=self._IDENTITY_ENCODING,
+                                        stream=True, allow_redirects=True)
+            
+            # Check for download confirmation (large files)
+            # Only cookies and headers are inspected: reading response.text here
+            # would buffer the whole file in memory before streaming starts
+            confirm = next((value for key, value in response.cookies.items()
+                            if key.startswith('download_warning')), None)
+            if (confirm is None and 'text/html' in response.headers.get('Content-Type', '')
+                    and 'Content-Disposition' not in response.headers):
+                # Newer warning pages set no cookie; confirm=t is accepted instead
+                confirm = 't'
+            if confirm is not None:
+                # Drain the small warning page so its keep-alive connection
+                # goes back to the shared pool instead of being dropped
+                response.raw.drain_conn()
+                response = self.session.get(f"{download_url}&confirm={confirm}",
+                                            headers=self._IDENTITY_ENCODING, stream=True)
+            
+            # Name the file from the response that is actually streamed: only it
+            # carries the real Content-Disposition for confirmed large files
+            filename = self._filename_from_response(file_id, response)
             
             # Create download directory
             if folder_name:
@@ -231,50 +561,162 @@ class GDriveDownloader:
             else:
                 save_dir = self.download_dir
             
-            os.makedirs(save_dir, exist_ok=True)
+            # makedirs stats every path component, so only call it once per directory.
+            # No lock needed: a racing duplicate call is harmless with exist_ok
+            if save_dir not in self._created_dirs:
+                os.makedirs(save_dir, exist_ok=True)
+                self._created_dirs.add(save_dir)
             filepath = os.path.join(save_dir, filename)
             
-            # Use existing response if available
-            response = metadata.get('response')
-            if not response:
-                url = metadata['url']
-                response = self.session.get(url, stream=True, allow_redirects=True)
-            
-            # Check for download confirmation (large files)
-            cookies = response.cookies
-            if 'download_warning' in response.text or response.status_code != 200:
-                for key, value in cookies.items():
-                    if key.startswith('download_warning'):
-                        url = f"{metadata['url']}&confirm={value}"
-                        response = self.session.get(url, stream=True)
-                        break
-            
             # Save file
             total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
+            # Copy in 1 MiB blocks so the per-chunk Python overhead is amortized
+            buffer_size = max(int(self.config.get("chunk_size", 1048576)), 1 << 20)
+            parts = max(int(self.config.get("range_parts", 4)), 1)
+            
+            counters = [0] * parts
+            self._progress[filepath] = (filename, total_size, counters)
+            # Write under a temporary name: the file is preallocated, so a failed
+            # download left in place would look complete
+            part_path = filepath + '.part'
             
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=self.config.get("chunk_size", 32768)):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # Print progress
-                        if total_size > 0:
-                            progress = (downloaded / total_size) * 100
-                            with self.lock:
-                                print(f"  [{filename}] {progress:.1f}% - {downloaded}/{total_size} bytes", end='\r')
+            try:
+                ranged = False
+                # Split large files into parallel range requests when the server allows it
+                if (parts > 1 and hasattr(os, 'pwrite') and total_size > 0
+                        and total_size >= self.config.get("range_min_size", 67108864)
+                        and response.headers.get('Accept-Ranges') == 'bytes'
+                        and 'Content-Encoding' not in response.headers):
+                    response.close()
+                    ranged = self._ranged_download(response.url, part_path, total_size, parts, counters, buffer_size)
+                    if not ranged:
+                        # Range was ignored (200 instead of 206): fall back to a single stream
+                        counters[:] = [0] * parts
+                        response = self.session.get(response.url, headers=self._IDENTITY_ENCODING, stream=True)
+                
+                if not ranged:
+                    # Closing the response releases its connection even if the copy fails
+                    with response, open(part_path, 'wb') as f:
+                        # Content-Length is the encoded size for compressed bodies
+                        if total_size > 0 and 'Content-Encoding' not in response.headers:
+                            self._preallocate(f.fileno(), total_size)
+                        self._copy_response(response, _ProgressWriter(f, counters), buffer_size)
+                os.replace(part_path, filepath)
+            except BaseException:
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+                raise
+            finally:
+                self._progress.pop(filepath, None)
             
-            with self.lock:
-                print(f"\n✓ Downloaded: {filename}")
-                print(f"  Saved to: {filepath}\n")
+            self._log(f"\n✓ Downloaded: {filename}\n  Saved to: {filepath}\n")
             return True
             
         except Exception as e:
-            with self.lock:
-                print(f"✗ Error downloading {file_id}: {str(e)}")
+            self._log(f"✗ Error downloading {file_id}: {str(e)}")
             return False
     
+    def _log(self, message, end='\n'):
+        """Hand a message to the logger thread, or print it directly when none is running"""
+        if self._logger is None:
+            print(message, end=end)
+        else:
+            self._log_queue.put((message, end))
+
+    def _log_writer(self):
+        """Write queued messages in order until the None sentinel arrives
+
+        The reporter's status block stays below the log: it is erased before
+        each message and redrawn after it.
+        """
+        block = ''
+        block_lines = 0
+        while True:
+            item = self._log_queue.get()
+            # Cursor to the first status line, then clear to the end of the screen
+            erase = f"\x1b[{block_lines}F\x1b[J" if block_lines else ''
+            if item is None:
+                text = erase
+            else:
+                message, end = item
+                if end is None:
+                    # A status block from the reporter replaces the previous one
+                    block = ''.join(f"  {line}\n" for line in message)
+                    block_lines = len(message)
+                    text = erase + block
+                else:
+                    text = erase + message + end + block
+            if text:
+                # One write per message through sys.stdout, which keeps the Windows
+                # console's Unicode output path (raw fd writes would be mojibake there)
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            if item is None:
+                return
+
+    def _reporter(self, stop, interval=0.25):
+        """Report running downloads, one line each, until `stop` is set
+
+        On an ANSI terminal the lines form a status block that is repainted in
+        place. Otherwise (pipes, files, legacy consoles) plain lines are logged
+        every few seconds instead.
+        """
+        ansi = _stdout_supports_ansi()
+        if not ansi:
+            interval = max(interval, 5)
+        last = []
+        while not stop.wait(interval):
+            # Keep the block inside the terminal: wrapped lines or a block taller than
+            # the screen would put the cursor-up target out of reach
+            columns, rows = shutil.get_terminal_size()
+            status = []
+            for filename, total_size, counters in list(self._progress.values()):
+                if total_size > 0:
+                    downloaded = sum(counters)
+                    line = f"[{filename}] {downloaded / total_size * 100:.1f}% - {downloaded}/{total_size} bytes"
+                    status.append(line[:columns - 3])
+            if not ansi:
+                for line in status:
+                    self._log(f"  {line}")
+                continue
+            if len(status) > rows - 1:
+                shown = max(rows - 2, 0)
+                status[shown:] = [f"+{len(status) - shown} more"]
+            if status != last:
+                self._log_queue.put((status, None))
+                last = status
+
+    def _probe(self, index, total, link, file_id):
+        """Resolve one link into download tasks, expanding folders recursively
+
+        Runs on the worker pool, so instead of printing it returns
+        (messages, tasks) with tasks as (file_id, folder_name) tuples.
+        """
+        if not file_id:
+            return [f"✗ Invalid link: {link}"], []
+        
+        # An exception here would surface in download_multiple's map loop and
+        # abort every other link, so report it like an invalid link instead
+        try:
+            # If link is a folder, expand its contents and queue files recursively
+            if self.is_folder(file_id):
+                folder_name = self.get_folder_name(file_id)
+                messages = [f"[{index}/{total}] Expanding folder: {file_id} -> {folder_name}"]
+                # Listing warnings join this link's messages, keeping the log in link order
+                items = self.list_folder_items(file_id, parent_folder_name=folder_name, messages=messages)
+                if not items:
+                    messages.append(f"  ⚠ No items found or unable to list folder: {file_id}")
+                else:
+                    messages.append(f"  → Queued {len(items)} items from folder {file_id}")
+                return messages, items
+            
+            # For files, download directly to root (or specify folder if desired)
+            return [f"[{index}/{total}] Queued file: {file_id}"], [(file_id, None)]
+        except Exception as e:
+            return [f"✗ Error resolving {link}: {e}"], []
+
     def download_multiple(self, drive_links):
         """Download multiple files using multi-threading"""
         print(f"\n{'='*60}")
@@ -282,36 +724,41 @@ class GDriveDownloader:
         print(f"Download directory: {os.path.abspath(self.download_dir)}")
         print(f"{'='*60}\n")
         
-        tasks = []
-        for i, link in enumerate(drive_links, 1):
-            file_id = self.extract_file_id(link)
-            if file_id:
-                # If link is a folder, expand its contents and queue files recursively
-                if self.is_folder(file_id):
-                    folder_name = self.get_folder_name(file_id)
-                    print(f"[{i}/{len(drive_links)}] Expanding folder: {file_id} -> {folder_name}")
-                    items = self.list_folder_items(file_id, parent_folder_name=folder_name)
-                    if not items:
-                        print(f"  ⚠ No items found or unable to list folder: {file_id}")
-                    else:
-                        for fid, fname in items:
-                            tasks.append((fid, fname))
-                        print(f"  → Queued {len(items)} items from folder {file_id}")
-                else:
-                    # For files, download directly to root (or specify folder if desired)
-                    tasks.append((file_id, None))
-                    print(f"[{i}/{len(drive_links)}] Queued file: {file_id}")
-            else:
-                print(f"✗ Invalid link: {link}")
-        
-        print(f"\n{'='*60}\n")
-        
         successful = 0
         failed = 0
         
+        # Open the first connection (DNS + TLS) before the workers start; failures surface later
+        try:
+            self.session.head('https://drive.google.com/', timeout=5)
+        except requests.RequestException:
+            pass
+        
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Resolve links (folder checks and expansion) concurrently on the same pool;
+            # map yields results in link order, so the log reads as before
+            tasks = []
+            file_ids = self.extract_file_ids(drive_links)
+            probes = executor.map(self._probe, range(1, len(drive_links) + 1),
+                                  repeat(len(drive_links)), drive_links, file_ids)
+            for messages, link_tasks in probes:
+                for message in messages:
+                    print(message)
+                tasks.extend(link_tasks)
+            
+            print(f"\n{'='*60}\n")
+            
+            # Workers only enqueue messages; one logger thread owns stdout
+            self._logger = threading.Thread(target=self._log_writer, daemon=True)
+            self._logger.start()
+            
+            # A single reporter thread prints progress, so workers never print per chunk
+            stop_reporter = threading.Event()
+            reporter = threading.Thread(target=self._reporter, args=(stop_reporter,), daemon=True)
+            reporter.start()
+            
             futures = {
-                executor.submit(self.download_file, file_id, folder_name): (file_id, folder_name)
+                # Every task was classified as a file while queueing, so skip the re-check
+                executor.submit(self.download_file, file_id, folder_name, False): (file_id, folder_name)
                 for file_id, folder_name in tasks
             }
             
@@ -321,6 +768,12 @@ class GDriveDownloader:
                 else:
                     failed += 1
         
+        stop_reporter.set()
+        reporter.join()
+        self._log_queue.put(None)
+        self._logger.join()
+        self._logger = None
+        
         print(f"\n{'='*60}")
         print(f"📊 Download Summary")
         print(f"{'='*60}")